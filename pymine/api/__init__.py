@@ -13,20 +13,29 @@
 
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import itertools
 import importlib
 import asyncio
 import zipfile
 import time
+import json
 import yaml
 import git
 import sys
 import os
 
+try:  # use the libyaml bindings if they're available, they're a lot faster
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
 from pymine.api.events import PacketEvent, ServerStartEvent, ServerStopEvent
 from pymine.types.abc import AbstractPlugin, AbstractEvent
 from pymine.api.commands import CommandHandler
 from pymine.api.register import Register
 
+SEP_TO_DOT = str.maketrans({"\\": ".", "/": "."})  # used to turn file paths into module paths
+
 
 class PyMineAPI:
     def __init__(self, server):
@@ -34,18 +43,22 @@ class PyMineAPI:
         self.console = server.console
 
         self.plugins = {}  # {plugin_quali_name: plugin_cog_instance}
-        self.tasks = []
+        self.tasks = set()  # handler tasks which haven't finished yet
         self.console_task = None
 
+        self._pip_sem = asyncio.Semaphore(4)  # limits how many pip processes can run at once
+
         self.commands = CommandHandler(server)  # for commands
         self.register = Register()  # for non-event registering, like world generators
 
-        self.eid_current = 0  # used to not generate duplicate entity ids
+        self.eid = itertools.count(1).__next__  # used to generate entity ids, calling it never returns the same id twice
 
     def trigger_handlers(self, handlers: dict) -> None:
         for handler in handlers.values():
             try:
-                self.tasks.append(asyncio.create_task(handler()))
+                task = asyncio.create_task(handler())
+                task.add_done_callback(self.tasks.discard)
+                self.tasks.add(task)
             except BaseException as e:
                 self.console.error(
                     f"Failed to call handler {handler.__module__}.{handler.__qualname__} due to: {self.console.f_traceback(e)}"
@@ -54,9 +67,25 @@ class PyMineAPI:
     async def call_async(self, func, *args, **kwargs):  # used to run a blocking function in a process pool
         await asyncio.get_event_loop().run_in_executor(self.executor, func, *args, **kwargs)
 
-    def eid(self):  # used to generate entity ids
-        self.eid_current += 1
-        return self.eid_current
+    async def run_in_thread(self, func, *args):  # used to run a blocking function in the thread pool
+        return await asyncio.get_event_loop().run_in_executor(self.server.thread_executor, func, *args)
+
+    async def import_module(self, module_path):  # imports a plugin module in the thread pool, see docs/plugin.rst
+        return await self.run_in_thread(importlib.import_module, module_path)
+
+    @staticmethod
+    def import_modules(directory):
+        """Recursively imports every .py file under a directory."""
+
+        dirs = [directory]
+
+        while dirs:
+            with os.scandir(dirs.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir():
+                        dirs.append(entry.path)
+                    elif entry.name.endswith(".py"):
+                        importlib.import_module(entry.path[:-3].translate(SEP_TO_DOT))
 
     def update_repo(self, git_dir, git_url, root, plugin_name, do_clone=False):
         if do_clone:
@@ -90,12 +119,44 @@ class PyMineAPI:
     @staticmethod
     def load_plugin_config(root):
         plugin_config_file = os.path.join(root, "plugin.yml")
+        cache_file = os.path.join(root, ".plugin.yml.cache.json")  # parsed plugin.yml, json is much faster to load
+
+        mtime = os.stat(plugin_config_file).st_mtime_ns
+        conf = None
 
         try:
-            with open(plugin_config_file) as conf:
-                conf = yaml.safe_load(conf.read())
-        except yaml.YAMLError:
-            raise ValueError("Failed to parse plugin.yml")
+            with open(cache_file) as cache:
+                cache = json.load(cache)
+
+            if cache["mtime"] == mtime:
+                conf = cache["conf"]
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+        if conf is None:
+            try:
+                with open(plugin_config_file) as conf:
+                    conf = yaml.load(conf, Loader=SafeLoader)
+            except yaml.YAMLError:
+                raise ValueError("Failed to parse plugin.yml")
+
+            try:
+                cache = json.dumps({"mtime": mtime, "conf": conf})
+            except (TypeError, ValueError):  # json can't hold things like dates or sets
+                cache = None
+
+            # only cache data which json gives back unchanged, int keys for example would come back as strs
+            if cache is not None and json.loads(cache)["conf"] == conf:
+                try:  # write to a temp file first so a half written cache is never read
+                    with open(cache_file + ".tmp", "w") as cache_tmp:
+                        cache_tmp.write(cache)
+
+                    os.replace(cache_file + ".tmp", cache_file)
+                except OSError:
+                    try:
+                        os.remove(cache_file + ".tmp")
+                    except OSError:
+                        pass
 
         if not isinstance(conf, dict):
             raise ValueError("plugin.yml must contain a dict")
@@ -112,8 +173,7 @@ class PyMineAPI:
 
         return conf
 
-    @staticmethod
-    async def install_plugin_deps(root):  # may need to be altered to support poetry.
+    async def install_plugin_deps(self, root):  # may need to be altered to support poetry.
         """Installs dependencies for a plugin."""
 
         requirements_file = os.path.join(root, "requirements.txt")
@@ -122,31 +182,34 @@ class PyMineAPI:
             if not os.path.isfile(sys.executable):
                 raise RuntimeError("Couldn't find system executable to update dependencies.")
 
-            proc = await asyncio.subprocess.create_subprocess_shell(
-                f"{sys.executable} -m pip install -U -r {requirements_file}",
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-            )
+            async with self._pip_sem:
+                proc = await asyncio.subprocess.create_subprocess_shell(
+                    f"{sys.executable} -m pip install -U -r {requirements_file}",
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE,
+                )
 
-            _, stderr = await asyncio.wait_for(proc.communicate(), 120)
+                _, stderr = await asyncio.wait_for(proc.communicate(), 120)
 
             if proc.returncode != 0:
                 raise RuntimeError(stderr.decode())
 
-    async def load_plugin(self, git_dir, plugin_name):
+    async def load_plugin(self, git_dir, plugin_entry):
         """Handles plugin-auto-updating, loading plugin configs, and importing + calling the setup() function in a plugin."""
 
+        plugin_name = plugin_entry.name
+
         if plugin_name.startswith("."):
             return
 
-        root = os.path.join("plugins", plugin_name)
+        root = plugin_entry.path
 
-        if os.path.isfile(root):
+        if plugin_entry.is_file():  # uses the file type from scandir(), so no extra stat() call
             if root.endswith(".py"):  # .py file (so try to import)
                 try:
-                    plugin_path = root.rstrip(".py").replace("\\", "/").replace("/", ".")
+                    plugin_path = root[:-3].translate(SEP_TO_DOT)
 
-                    plugin_module = importlib.import_module(plugin_path)
+                    plugin_module = await self.import_module(plugin_path)
                     await plugin_module.setup(None)
 
                     self.plugins[plugin_path] = plugin_module
@@ -155,14 +218,11 @@ class PyMineAPI:
 
             return
 
-        plugin_config_file = os.path.join(root, "plugin.yml")
-
-        if not os.path.isfile(plugin_config_file):
-            self.console.error(f"Error while loading {plugin_name}: Missing plugin.yml.")
-            return
-
         try:
             conf = self.load_plugin_config(root)
+        except FileNotFoundError:
+            self.console.error(f"Error while loading {plugin_name}: Missing plugin.yml.")
+            return
         except ValueError as e:
             self.console.error(f"Error while loading {plugin_name}: Invalid plugin.yml ({str(e)})")
             return
@@ -189,10 +249,10 @@ class PyMineAPI:
         if conf.get("module_folder"):
             plugin_path = os.path.join(plugin_path, conf["module_folder"])
 
-        plugin_path = plugin_path.replace("\\", "/").replace("/", ".")
+        plugin_path = plugin_path.translate(SEP_TO_DOT)
 
         try:
-            plugin_module = importlib.import_module(plugin_path)
+            plugin_module = await self.import_module(plugin_path)
         except BaseException as e:
             self.console.error(f"Error while loading {plugin_name}: {self.console.f_traceback(e)}")
             return
@@ -214,48 +274,48 @@ class PyMineAPI:
 
         self.plugins[plugin_quali_name] = plugin
 
-        for attr in dir(plugin):
-            thing = getattr(plugin, attr)
+        # class body events are collected when the plugin cog class is created, see AbstractEvent.__set_name__
+        events = dict(type(plugin).__pymine_events__)
 
+        # packet events wrap bound methods (see Register.on_packet), so they're assigned on the instance instead
+        for attr, thing in getattr(plugin, "__dict__", {}).items():
             if isinstance(thing, AbstractEvent):
-                if isinstance(thing, PacketEvent):
-                    try:
-                        self.register._on_packet[thing.state_id][thing.packet_id][plugin_quali_name] = thing
-                    except KeyError:
-                        self.register._on_packet[thing.state_id][thing.packet_id] = {plugin_quali_name: thing}
-                elif isinstance(thing, ServerStartEvent):
-                    self.register._on_server_start[plugin_quali_name] = thing
-                elif isinstance(thing, ServerStopEvent):
-                    self.register._on_server_stop[plugin_quali_name] = thing
-                else:
-                    self.console.warn(f"Unsupported event type: {thing.__module__}.{thing.__class__.__qualname__}")
+                events[attr] = thing
+
+        for thing in events.values():
+            if isinstance(thing, PacketEvent):
+                self.register._on_packet[thing.state_id][thing.packet_id][plugin_quali_name] = thing
+            elif isinstance(thing, ServerStartEvent):
+                self.register._on_server_start[plugin_quali_name] = thing
+            elif isinstance(thing, ServerStopEvent):
+                self.register._on_server_stop[plugin_quali_name] = thing
+            else:
+                self.console.warn(f"Unsupported event type: {thing.__module__}.{thing.__class__.__qualname__}")
 
     async def init(self):  # called when server starts up
         self.commands.load_commands()
 
         # Load packet handlers / packet logic handlers under pymine/logic/handle
-        for root, dirs, files in os.walk(os.path.join("pymine", "logic", "handle")):
-            for file in filter((lambda f: f.endswith(".py")), files):
-                importlib.import_module(os.path.join(root, file)[:-3].replace("\\", "/").replace("/", "."))
+        self.import_modules(os.path.join("pymine", "logic", "handle"))
 
         # Load world generators from pymine/logic/world_gen
-        for root, dirs, files in os.walk(os.path.join("pymine", "logic", "world_gen")):
-            for file in filter((lambda f: f.endswith(".py")), files):
-                importlib.import_module(os.path.join(root, file)[:-3].replace("\\", "/").replace("/", "."))
+        self.import_modules(os.path.join("pymine", "logic", "world_gen"))
 
         try:
             os.mkdir("plugins")
         except FileExistsError:
             pass
 
-        plugins_dir = os.listdir("plugins")
+        with os.scandir("plugins") as plugins_dir:
+            plugins_dir = list(plugins_dir)
+
         git_dir = git.Git("plugins")
 
         results = await asyncio.gather(*[self.load_plugin(git_dir, plugin) for plugin in plugins_dir], return_exceptions=True)
 
         for plugin, result in zip(plugins_dir, results):
             if isinstance(result, BaseException):
-                self.console.error(f"Error while loading {plugin}: {self.console.f_traceback(result)}")
+                self.console.error(f"Error while loading {plugin.name}: {self.console.f_traceback(result)}")
 
         # start console command handler task
         self.console_task = asyncio.create_task(self.commands.handle_console_commands())
@@ -265,10 +325,10 @@ class PyMineAPI:
     async def stop(self):  # called when server is stopping
         self.console_task.cancel()
 
-        for task in self.tasks:
-            try:
-                await asyncio.wait_for(task, 5)
-            except asyncio.TimeoutError:
+        if self.tasks:
+            _, pending = await asyncio.wait(self.tasks, timeout=5)
+
+            for task in pending:
                 task.cancel()
 
         for plugin_name, plugin_cog in self.plugins.items():
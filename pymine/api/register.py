@@ -13,6 +13,7 @@
 
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
+from collections import defaultdict
 import asyncio
 
 from pymine.api.events import PacketEvent, ServerStartEvent, ServerStopEvent
@@ -28,7 +29,7 @@ class Register:
         # handshaking, login, play, status
         # (state, state, state, state)
         # {packet_id: {plugin_quali_name: event_object}}
-        self._on_packet = ({}, {}, {}, {})
+        self._on_packet = (defaultdict(dict), defaultdict(dict), defaultdict(dict), defaultdict(dict))
 
         # other/generic events, {plugin_quali_name: event_object}
         self._on_server_start = {}
@@ -56,10 +57,7 @@ class Register:
                 return PacketEvent(func, state_id, packet_id)
 
             # If we're here, this is probably a packet handler under logic/handle, so we need to account for that
-            try:
-                self._on_packet[state_id][packet_id][f"{func.__module__}.{func.__qualname__}"] = func
-            except KeyError:
-                self._on_packet[state_id][packet_id] = {f"{func.__module__}.{func.__qualname__}": func}
+            self._on_packet[state_id][packet_id][f"{func.__module__}.{func.__qualname__}"] = func
 
             return func
 
@@ -15,8 +15,11 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 __all__ = (
     "POSES",
+    "POSE_IDS",
     "DIRECTIONS",
+    "DIRECTION_IDS",
     "SMELT_TYPES",
+    "SMELT_TYPE_IDS",
 )
 
 POSES = (
@@ -44,3 +47,8 @@ SMELT_TYPES = (
     "minecraft:smoking",
     "minecraft:campfire_cooking",
 )
+
+# {name: id} maps of the above
+POSE_IDS = {pose: i for i, pose in enumerate(POSES)}
+DIRECTION_IDS = {direction: i for i, direction in enumerate(DIRECTIONS)}
+SMELT_TYPE_IDS = {smelt_type: i for i, smelt_type in enumerate(SMELT_TYPES)}
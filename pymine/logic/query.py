@@ -13,23 +13,30 @@
 
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
+from collections import OrderedDict
 import asyncio_dgram
 import asyncio
 import struct
 
 from pymine.api.errors import ServerBindingError
 
+# precompiled structs for the query protocol types
+_S_SHORT = struct.Struct("<h")
+_S_MAGIC = struct.Struct(">H")
+_S_I32 = struct.Struct(">i")
+_S_B = struct.Struct(">b")
+
 
 class QueryBuffer:
     """Buffer for the query protocol, contains method for dealing with query protocol types.
 
-    :param bytes buf:  Internal bytes object, used to store the data in the QueryBuffer.
-    :ivar type pos: The position in the internal bytes/buffer object.
+    :param bytes buf:  Initial data, copied into the internal bytearray used to store the data in the QueryBuffer.
+    :ivar type pos: The position in the internal bytearray/buffer object.
     :ivar buf:
     """
 
     def __init__(self, buf: bytes = None) -> None:
-        self.buf = b"" if buf is None else buf
+        self.buf = bytearray() if buf is None else bytearray(buf)
         self.pos = 0
 
     def write(self, data: bytes) -> None:
@@ -39,7 +46,7 @@ class QueryBuffer:
         :return: None
         """
 
-        self.buf += data
+        self.buf.extend(data)
 
     def read(self, length: int = None) -> bytes:
         """
@@ -67,10 +74,12 @@ class QueryBuffer:
     @staticmethod
     # Why is short the only little-endian one? Nobody knows.
     def pack_short(short: int) -> bytes:
-        return struct.pack("<h", short)
+        return _S_SHORT.pack(short)
 
     def unpack_short(self) -> int:
-        return struct.unpack("<h", self.read(2))[0]
+        short = _S_SHORT.unpack_from(self.buf, self.pos)[0]
+        self.pos += 2
+        return short
 
     @staticmethod
     def pack_magic() -> bytes:
@@ -79,7 +88,8 @@ class QueryBuffer:
         # struct.pack('>H', 65527)
 
     def unpack_magic(self) -> int:
-        magic = struct.unpack(">H", self.read(2))[0]
+        magic = _S_MAGIC.unpack_from(self.buf, self.pos)[0]
+        self.pos += 2
 
         if magic != 65277:
             raise ValueError(f"{magic} is not 65277")
@@ -91,29 +101,29 @@ class QueryBuffer:
         return bytes(str(string), "latin-1") + b"\x00"
 
     def unpack_string(self) -> str:
-        out = b""
-
-        while True:
-            b = self.read(1)
-            if b == b"\x00":  # null byte, end of string
-                break
-            out += b
+        end = self.buf.index(b"\x00", self.pos)  # null byte, end of string
+        out = bytes(self.buf[self.pos : end])
+        self.pos = end + 1
 
         return out.decode("latin-1")
 
     @staticmethod
     def pack_int32(num: int) -> bytes:
-        return struct.pack(">i", num)
+        return _S_I32.pack(num)
 
     def unpack_int32(self) -> int:
-        return struct.unpack(">i", self.read(4))[0]
+        num = _S_I32.unpack_from(self.buf, self.pos)[0]
+        self.pos += 4
+        return num
 
     @staticmethod
     def pack_byte(byte: int) -> bytes:
-        return struct.pack(">b", byte)
+        return _S_B.pack(byte)
 
     def unpack_byte(self) -> int:
-        return struct.unpack(">b", self.read(1))[0]
+        byte = _S_B.unpack_from(self.buf, self.pos)[0]
+        self.pos += 1
+        return byte
 
 
 class QueryServer:
@@ -136,11 +146,74 @@ class QueryServer:
             self.port = server.port
 
         self._server = None  # the result of asyncio_dgram.bind(...) (a stream)
-        self.server_task = None  # the task that handles packets
+        self.server_task = None  # the task that receives and handles packets
 
         self.challenge_cache = {}  # {remote_ip: challenge_token (string)}
+        self.last_sent = OrderedDict()  # {remote: loop time of last full stat response}, oldest first
+
+        # static parts of the stat responses, everything before and after the player count
+        self._full_stat_template_prefix = None
+        self._full_stat_template_suffix = None
+        self._basic_stat_template_prefix = None
+        self._basic_stat_template_suffix = None
+
+    def cache_stat_templates(self) -> None:
+        """Packs the parts of the stat responses which only depend on the server config, should be called again if it changes."""
+
+        conf = self.server.conf
+
+        self._full_stat_template_prefix = b"".join(
+            (
+                b"\x73\x70\x6C\x69\x74\x6E\x75\x6D\x00\x80\x00",  # constant data / padding
+                QueryBuffer.pack_string("hostname"),
+                QueryBuffer.pack_string(conf["motd"]),
+                QueryBuffer.pack_string("game type"),
+                QueryBuffer.pack_string("SMP"),
+                QueryBuffer.pack_string("game_id"),
+                QueryBuffer.pack_string("MINECRAFT"),
+                QueryBuffer.pack_string("version"),
+                QueryBuffer.pack_string(self.server.meta.version),
+                QueryBuffer.pack_string("plugins"),
+                QueryBuffer.pack_string(""),  # empty for now
+                QueryBuffer.pack_string("map"),
+                QueryBuffer.pack_string(conf["level_name"]),
+                QueryBuffer.pack_string("numplayers"),
+            )
+        )
+
+        self._full_stat_template_suffix = b"".join(
+            (
+                QueryBuffer.pack_string("maxplayers"),
+                QueryBuffer.pack_string(conf["max_players"]),
+                QueryBuffer.pack_string("hostport"),
+                QueryBuffer.pack_string(self.server.port),
+                QueryBuffer.pack_string("hostip"),
+                QueryBuffer.pack_string(self.server.addr),
+                b"\x00",
+                b"\x01\x70\x6C\x61\x79\x65\x72\x5F\x00\x00",  # more constant data / padding / whatever
+                b"Penis\x00\x00",  # should be player section, this means no players online
+            )
+        )
+
+        self._basic_stat_template_prefix = b"".join(
+            (
+                QueryBuffer.pack_string(conf["motd"]),
+                QueryBuffer.pack_string("SMP"),
+                QueryBuffer.pack_string(conf["level_name"]),
+            )
+        )
+
+        self._basic_stat_template_suffix = b"".join(
+            (
+                QueryBuffer.pack_string(conf["max_players"]),
+                QueryBuffer.pack_string(self.server.port),
+                QueryBuffer.pack_string(self.server.addr),
+            )
+        )
 
     async def start(self):
+        self.cache_stat_templates()
+
         try:
             self._server = await asyncio_dgram.bind((self.addr, self.port))
         except OSError:
@@ -154,7 +227,7 @@ class QueryServer:
         try:
             while True:
                 data, remote = await self._server.recv()
-                asyncio.create_task(self.handle_packet(remote, QueryBuffer(data)))
+                await self.handle_packet(remote, QueryBuffer(data))
         except asyncio.CancelledError:
             pass
         except BaseException as e:
@@ -189,52 +262,35 @@ class QueryServer:
                     return
 
                 if buf.buf[buf.pos : buf.pos + 4] == b"\x00\x00\x00\x00":  # full stat
-                    out = (
-                        QueryBuffer.pack_byte(packet_type)
-                        + QueryBuffer.pack_int32(session_id)
-                        + b"\x73\x70\x6C\x69\x74\x6E\x75\x6D\x00\x80\x00"  # constant data / padding
-                        + QueryBuffer.pack_string("hostname")
-                        + QueryBuffer.pack_string(self.server.conf["motd"])
-                        + QueryBuffer.pack_string("game type")
-                        + QueryBuffer.pack_string("SMP")
-                        + QueryBuffer.pack_string("game_id")
-                        + QueryBuffer.pack_string("MINECRAFT")
-                        + QueryBuffer.pack_string("version")
-                        + QueryBuffer.pack_string(self.server.meta.version)
-                        + QueryBuffer.pack_string("plugins")
-                        + QueryBuffer.pack_string("")  # empty for now
-                        + QueryBuffer.pack_string("map")
-                        + QueryBuffer.pack_string(self.server.conf["level_name"])
-                        + QueryBuffer.pack_string("numplayers")
-                        + QueryBuffer.pack_string(len(self.server.cache.states))
-                        + QueryBuffer.pack_string("maxplayers")
-                        + QueryBuffer.pack_string(self.server.conf["max_players"])
-                        + QueryBuffer.pack_string("hostport")
-                        + QueryBuffer.pack_string(self.server.port)
-                        + QueryBuffer.pack_string("hostip")
-                        + QueryBuffer.pack_string(self.server.addr)
-                        + b"\x00"
-                        + b"\x01\x70\x6C\x61\x79\x65\x72\x5F\x00\x00"  # more constant data / padding / whatever
-                        + b"Penis\x00\x00"  # should be player section, this means no players online
-                    )
+                    now = asyncio.get_event_loop().time()
+
+                    # drop entries older than 0.5s, they're in the order they were added so stop at the first newer one
+                    while self.last_sent and now - next(iter(self.last_sent.values())) >= 0.5:
+                        self.last_sent.popitem(last=False)
+
+                    if remote in self.last_sent:  # rate limit full stat responses per remote
+                        return
+
+                    self.last_sent[remote] = now
+
+                    prefix, suffix = self._full_stat_template_prefix, self._full_stat_template_suffix
                 else:  # basic stat
-                    out = (
-                        QueryBuffer.pack_byte(packet_type)
-                        + QueryBuffer.pack_int32(session_id)
-                        + QueryBuffer.pack_string(self.server.conf["motd"])
-                        + QueryBuffer.pack_string("SMP")
-                        + QueryBuffer.pack_string(self.server.conf["level_name"])
-                        + QueryBuffer.pack_string(len(self.server.cache.states))
-                        + QueryBuffer.pack_string(self.server.conf["max_players"])
-                        + QueryBuffer.pack_string(self.server.port)
-                        + QueryBuffer.pack_string(self.server.addr)
+                    prefix, suffix = self._basic_stat_template_prefix, self._basic_stat_template_suffix
+
+                out = b"".join(
+                    (
+                        QueryBuffer.pack_byte(packet_type),
+                        QueryBuffer.pack_int32(session_id),
+                        prefix,
+                        QueryBuffer.pack_string(len(self.server.cache.states)),
+                        suffix,
                     )
+                )
 
                 await self._server.send(out, remote)
-                await asyncio.sleep(0.5)  # fucking shit fucking protocol
 
-        except asyncio.CancelledError:
-            pass
+        except asyncio.CancelledError:  # awaited inline by handle(), so let it stop the receive loop
+            raise
         except BaseException as e:  # no one give s afucking shit
             self.console.error(f"Error while handling query packet: {self.console.f_traceback(e)}")
 
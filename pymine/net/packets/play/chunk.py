@@ -65,31 +65,42 @@ class PlayChunkData(Packet):
         self.full = full
 
     def encode(self) -> bytes:
-        out = Buffer.pack("i", self.chunk.x) + Buffer.pack("i", self.chunk.z) + Buffer.pack("?", self.full)
+        out = bytearray()
+
+        out += Buffer.pack("i", self.chunk.x)
+        out += Buffer.pack("i", self.chunk.z)
+        out += Buffer.pack("?", self.full)
 
         mask = 0
-        chunk_sections_buffer = Buffer()
+        chunk_sections = []
 
-        for y, section in self.chunk.sections.items():  # pack chunk columns into buffer and generate a bitmask
+        for y, section in self.chunk.sections.items():  # pack chunk columns and generate a bitmask
             if y >= 0:
                 mask |= 1 << y
-                chunk_sections_buffer.write(Buffer.pack_chunk_section_blocks(section))
+                chunk_sections.append(Buffer.pack_chunk_section_blocks(section))
 
-        out += Buffer.pack_varint(mask) + Buffer.pack_nbt(
+        out += Buffer.pack_varint(mask)
+        out += Buffer.pack_nbt(
             nbt.TAG_Compound("", [self.chunk["Heightmaps"]["MOTION_BLOCKING"], self.chunk["Heightmaps"]["WORLD_SURFACE"]])
         )
 
         if self.full:
-            out += Buffer.pack_varint(len(self.chunk["Biomes"])) + b"".join(
-                [Buffer.pack_varint(n) for n in self.chunk["Biomes"]]
-            )
+            biomes = self.chunk["Biomes"]
+
+            out += Buffer.pack_varint(len(biomes))
+
+            for n in biomes:
+                out += Buffer._SMALL_VARINT[n] if 0 <= n < 4096 else Buffer.pack_varint(n)
+
+        out += Buffer.pack_varint(sum(map(len, chunk_sections)))
 
-        out += Buffer.pack_varint(len(chunk_sections_buffer)) + chunk_sections_buffer.read()
+        for chunk_section in chunk_sections:
+            out += chunk_section
 
         # here we would pack the block entities, but we don't support them yet so we just send an array with length of 0
         out += Buffer.pack_varint(0)
 
-        return out
+        return out  # Buffer.pack_packet concatenates this onto bytes, so no need to copy it into bytes here
 
 
 class PlayUpdateLight(Packet):
@@ -16,6 +16,19 @@
 class AbstractPlugin:
     """Used to create plugin cogs."""
 
+    __pymine_events__ = {}  # {attribute_name: event_object}, filled in by AbstractEvent.__set_name__
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+
+        events = {}
+
+        for klass in reversed(cls.__mro__):  # merge the events of the base classes, subclasses take precedence
+            events.update(klass.__dict__.get("__pymine_events__", {}))
+
+        # drop events which were overridden by something else in a subclass
+        cls.__pymine_events__ = {name: event for name, event in events.items() if getattr(cls, name, None) is event}
+
 
 class AbstractWorldGenerator:
     """Abstract class used to create a world generator."""
@@ -72,5 +85,11 @@ class AbstractPalette:
 class AbstractEvent:
     """Used to create event classes for event handling."""
 
+    def __set_name__(self, owner, name):  # called when the event is assigned in a class body, i.e. a plugin cog
+        if "__pymine_events__" not in owner.__dict__:
+            owner.__pymine_events__ = {}
+
+        owner.__pymine_events__[name] = self
+
     def __call__(self, *args, **kwargs):
         return self.handler(*args, **kwargs)
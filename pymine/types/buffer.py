@@ -16,6 +16,7 @@
 from __future__ import annotations
 import immutables
 import struct
+import numpy
 import json
 import uuid
 import zlib
@@ -34,6 +35,17 @@ from pymine.data.tags import TAGS
 from pymine.api.errors import InvalidPacketID
 from pymine.types.abc import AbstractPalette
 
+_STRUCT_CACHE = {}  # {format: struct.Struct}, formats are big-endian
+
+
+def _get_struct(f: str) -> struct.Struct:
+    s = _STRUCT_CACHE.get(f)
+
+    if s is None:
+        s = _STRUCT_CACHE[f] = struct.Struct(">" + f)
+
+    return s
+
 
 class Buffer:
     """
@@ -84,7 +96,8 @@ class Buffer:
         self.pos = 0
 
     def unpack(self, f: str) -> object:
-        unpacked = struct.unpack(">" + f, self.read(struct.calcsize(f)))
+        s = _get_struct(f)
+        unpacked = s.unpack(self.read(s.size))
 
         if len(unpacked) == 1:
             return unpacked[0]
@@ -93,7 +106,7 @@ class Buffer:
 
     @classmethod
     def pack(cls, f: str, *data: object) -> bytes:
-        return struct.pack(">" + f, *data)
+        return _get_struct(f).pack(*data)
 
     @classmethod
     def pack_packet(cls, packet: Packet, comp_thresh: int = -1) -> bytes:
@@ -330,7 +343,7 @@ class Buffer:
     def pack_direction(cls, direction: str) -> bytes:
         """Packs a direction into bytes."""
 
-        return cls.pack_varint(misc_data.DIRECTIONS.index(direction))
+        return cls.pack_varint(misc_data.DIRECTION_IDS[direction])
 
     def unpack_direction(self) -> str:
         """Unpacks a direction from the buffer."""
@@ -341,7 +354,7 @@ class Buffer:
     def pack_positione(cls, pose: str) -> bytes:
         """Packs a pose into bytes."""
 
-        return cls.pack_varint(misc_data.POSES.index(pose))
+        return cls.pack_varint(misc_data.POSE_IDS[pose])
 
     def unpack_positione(self) -> str:
         """Unpacks a pose from the buffer."""
@@ -624,6 +637,15 @@ class Buffer:
             # pack and return the block state long array
             return cls.pack_varint(len(data)) + b"".join([cls.pack("q", q) for q in data])
 
+    @classmethod
+    def pack_light_array(cls, light: numpy.ndarray) -> bytes:
+        """Packs a 16x16x16 light array into a nibble array, ordered by y, z then x."""
+
+        light = light.astype(numpy.uint8) & 0x0F
+        nibbles = light[0::2] | (light[1::2] << 4)  # pair up light values along the first axis
+
+        return numpy.ascontiguousarray(nibbles.transpose(1, 2, 0)).tobytes()
+
     @classmethod
     def pack_chunk_light(cls, chunk: Chunk) -> bytes:
         out = cls.pack_varint(chunk.x) + cls.pack_varint(chunk.z) + cls.pack("?", True)
@@ -647,36 +669,18 @@ class Buffer:
 
                 continue
 
-            if section.sky_light is None or len(section.sky_light.nonzero()) == 0:
+            if section.sky_light is None or not section.sky_light.any():
                 empty_sky_light_mask |= 1 << section_y
             else:
                 sky_light_mask |= 1 << section_y
-
-                sky_light_array = b""
-
-                for y in range(16):
-                    for z in range(16):
-                        for x in range(0, 16, 2):
-                            sky_light_array += cls.pack_byte(
-                                section.sky_light[x][y][z] | (section.sky_light[x + 1][y][z] << 4)
-                            )
-
+                sky_light_array = cls.pack_light_array(section.sky_light)
                 sky_light_arrays.append(cls.pack_varint(len(sky_light_array)) + sky_light_array)
 
-            if section.block_light is None or len(section.block_light.nonzero()) == 0:
+            if section.block_light is None or not section.block_light.any():
                 empty_block_light_mask |= 1 << section_y
             else:
                 block_light_mask |= 1 << section_y
-
-                block_light_array = b""
-
-                for y in range(16):
-                    for z in range(16):
-                        for x in range(0, 16, 2):
-                            block_light_array += cls.pack_byte(
-                                section.block_light[x][y][z] | (section.block_light[x + 1][y][z] << 4)
-                            )
-
+                block_light_array = cls.pack_light_array(section.block_light)
                 block_light_arrays.append(cls.pack_varint(len(block_light_array)) + block_light_array)
 
         return (
@@ -687,3 +691,7 @@ class Buffer:
             + b"".join(sky_light_arrays)
             + b"".join(block_light_arrays)
         )
+
+
+# pre-packed varints for small non-negative numbers like biome ids, index with Buffer._SMALL_VARINT[n] if n < 4096
+Buffer._SMALL_VARINT = tuple(Buffer.pack_varint(i) for i in range(4096))
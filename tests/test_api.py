@@ -0,0 +1,44 @@
+from types import SimpleNamespace
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from pymine.types.abc import AbstractPlugin
+from pymine.api.register import Register
+from pymine.api import PyMineAPI
+from pymine.data.states import STATES
+
+
+class FakeConsole:
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+register = Register()
+
+
+class Cog(AbstractPlugin):
+    def __init__(self):
+        self.on_handshake = register.on_packet("handshaking", 0x00)(self.handle_handshake)
+
+    async def handle_handshake(self, stream, packet):
+        pass
+
+    @register.on_server_start
+    async def start(self):
+        pass
+
+
+def test_add_plugin():
+    api = PyMineAPI(SimpleNamespace(console=FakeConsole()))
+    cog = Cog()
+
+    api.add_plugin(cog)
+
+    quali_name = f"{Cog.__module__}.Cog"
+    state_id = STATES.encode("handshaking")
+
+    assert api.register._on_packet[state_id][0x00][quali_name] is cog.on_handshake
+    assert api.register._on_server_start[quali_name] is Cog.start
+    assert api.plugins[quali_name] is cog
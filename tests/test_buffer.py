@@ -1,3 +1,4 @@
+import numpy
 import json
 import sys
 import os
@@ -48,6 +49,9 @@ def test_varint():
     assert buf.unpack_varint() == 1
     assert buf.unpack_varint() == 3749146
 
+    for n in (0, 1, 127, 128, 4095):
+        assert Buffer._SMALL_VARINT[n] == Buffer.pack_varint(n)
+
 
 def test_optional_varint():
     buf = Buffer()
@@ -93,3 +97,17 @@ def test_json():
     for key, value in buf.unpack_json().items():
         assert key in data
         assert data[key] == value
+
+
+def test_light_array():
+    light = numpy.zeros((16, 16, 16), numpy.int8)
+    light[0, 0, 0] = 1
+    light[1, 0, 0] = 15
+    light[2, 0, 1] = 7
+
+    packed = Buffer.pack_light_array(light)
+
+    assert len(packed) == 2048
+    assert packed[0] == 0xF1  # x=0 in the low nibble, x=1 in the high nibble
+    assert packed[8 + 1] == 0x07  # y=0, z=1, x=2
+    assert packed.count(0) == 2046
@@ -0,0 +1,163 @@
+from types import SimpleNamespace
+import asyncio
+import pytest
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from pymine.logic.query import QueryBuffer, QueryServer
+
+
+def test_io():
+    buf = QueryBuffer()
+
+    assert buf.buf == b""
+    assert buf.pos == 0
+
+    buf.write(b"\x69\x00")
+    buf.write(b"\x01\x02\x03")
+
+    assert buf.read(1) == b"\x69"
+    assert buf.read(2) == b"\x00\x01"
+    assert buf.read() == b"\x02\x03"
+
+    buf.reset()
+    assert buf.read() == b"\x69\x00\x01\x02\x03"
+
+
+def test_basic():
+    buf = QueryBuffer()
+
+    buf.write(QueryBuffer.pack_magic())
+    buf.write(QueryBuffer.pack_byte(9))
+    buf.write(QueryBuffer.pack_int32(1234567))
+    buf.write(QueryBuffer.pack_short(25565))
+
+    assert buf.unpack_magic() == 65277
+    assert buf.unpack_byte() == 9
+    assert buf.unpack_int32() == 1234567
+    assert buf.unpack_short() == 25565
+
+
+def test_string():
+    buf = QueryBuffer()
+
+    buf.write(QueryBuffer.pack_string("hostname"))
+    buf.write(QueryBuffer.pack_string(""))
+    buf.write(QueryBuffer.pack_string("A Minecraft Server"))
+
+    assert buf.unpack_string() == "hostname"
+    assert buf.unpack_string() == ""
+    assert buf.unpack_string() == "A Minecraft Server"
+
+    buf = QueryBuffer(b"no null byte")
+
+    with pytest.raises(ValueError):
+        buf.unpack_string()
+
+
+class FakeConsole:
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+class FakeStream:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, data, remote):
+        self.sent.append((remote, bytes(data)))
+
+
+def make_query_server():
+    server = SimpleNamespace(
+        console=FakeConsole(),
+        addr="0.0.0.0",
+        port=25565,
+        conf={"query_port": None, "motd": "A Minecraft Server", "level_name": "world", "max_players": 20},
+        meta=SimpleNamespace(version="1.16.5"),
+        cache=SimpleNamespace(states={}),
+    )
+
+    query_server = QueryServer(server)
+    query_server.cache_stat_templates()
+    query_server._server = FakeStream()
+
+    return query_server
+
+
+def stat_request(full: bool) -> QueryBuffer:
+    return QueryBuffer(
+        QueryBuffer.pack_magic()
+        + QueryBuffer.pack_byte(0)
+        + QueryBuffer.pack_int32(1)
+        + QueryBuffer.pack_int32(0)
+        + (b"\x00\x00\x00\x00" if full else b"")
+    )
+
+
+def test_stat_rate_limit():
+    query_server = make_query_server()
+
+    async def run():
+        for remote in (("127.0.0.1", 1), ("127.0.0.1", 2)):  # handshakes, challenge token is 0
+            handshake = QueryBuffer(QueryBuffer.pack_magic() + QueryBuffer.pack_byte(9) + QueryBuffer.pack_int32(1))
+            await query_server.handle_packet(remote, handshake)
+
+        await query_server.handle_packet(("127.0.0.1", 1), stat_request(False))
+        await query_server.handle_packet(("127.0.0.1", 1), stat_request(True))
+        await query_server.handle_packet(("127.0.0.1", 1), stat_request(True))  # rate limited
+        await query_server.handle_packet(("127.0.0.1", 1), stat_request(False))  # basic stats aren't limited
+        await query_server.handle_packet(("127.0.0.1", 2), stat_request(True))
+
+    asyncio.run(run())
+
+    assert [remote for remote, _ in query_server._server.sent[2:]] == [
+        ("127.0.0.1", 1),
+        ("127.0.0.1", 1),
+        ("127.0.0.1", 1),
+        ("127.0.0.1", 2),
+    ]
+    assert list(query_server.last_sent) == [("127.0.0.1", 1), ("127.0.0.1", 2)]
+
+
+def test_inline_handling():
+    query_server = make_query_server()
+    stream = query_server._server
+
+    packets = [
+        (QueryBuffer.pack_magic() + QueryBuffer.pack_byte(9) + QueryBuffer.pack_int32(1), ("127.0.0.1", 1)),
+        (bytes(stat_request(False).buf), ("127.0.0.1", 1)),
+    ]
+
+    async def recv():
+        if packets:
+            return packets.pop(0)
+
+        await asyncio.Event().wait()  # no more packets, wait until cancelled
+
+    stream.recv = recv
+
+    handle_packet = query_server.handle_packet
+    handled_in = []
+
+    async def record_task(remote, buf):
+        handled_in.append(asyncio.current_task())
+        await handle_packet(remote, buf)
+
+    query_server.handle_packet = record_task
+
+    async def run():
+        task = asyncio.create_task(query_server.handle())
+
+        for _ in range(10):
+            await asyncio.sleep(0)
+
+        assert len(stream.sent) == 2
+        assert handled_in == [task, task]  # handled in the receive loop itself, no task per packet
+
+        task.cancel()
+        await task  # the receive loop stops on cancellation instead of swallowing it in handle_packet
+
+    asyncio.run(run())